@@ -3,12 +3,76 @@
 Cloud debug evaluation - runs all problems and generates report.
 """
 
-from src.evaluator import evaluate
+import argparse
+import sys
+
+from src.evaluator import FatalJudgeError, compare_runs, evaluate
 
 # Import your agent here
 from example_agent import ExampleAgent
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="ignore cached judgments and call the judge again, refreshing the cache",
+    )
+    parser.add_argument(
+        "--judge-batch-size",
+        type=int,
+        default=1,
+        help="number of problems scored per list-wise judge call (default: 1)",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--batch",
+        action="store_true",
+        help="judge through the OpenAI Batch API: half the cost, results within 24h",
+    )
+    mode.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="run problems on an asyncio event loop for high-fanout evaluations",
+    )
+    parser.add_argument(
+        "--judge-model",
+        default="gpt-4o",
+        help="judge as backend:model, e.g. openai:gpt-4o or local:prometheus-7b",
+    )
+    parser.add_argument(
+        "--judge-samples",
+        type=int,
+        default=3,
+        help="judge samples per judgment, scored by median (default: 3; 1 is greedy)",
+    )
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("AGENT_A", "AGENT_B"),
+        help="diff the latest stored runs of two agents instead of evaluating",
+    )
+    args = parser.parse_args()
+    if args.judge_batch_size > 1 and (args.batch or args.use_async):
+        parser.error("--judge-batch-size cannot be combined with --batch or --async")
+
+    if args.compare:
+        compare_runs(*args.compare)
+        sys.exit()
+
     # Initialize agent and run evaluation
     agent = ExampleAgent()
-    evaluate(agent.solve_problem, "example")
\ No newline at end of file
+    try:
+        evaluate(
+            agent.solve_problem,
+            "example",
+            use_cache=not args.no_cache,
+            judge_batch_size=args.judge_batch_size,
+            use_batch_api=args.batch,
+            use_async=args.use_async,
+            judge_model=args.judge_model,
+            judge_samples=args.judge_samples,
+        )
+    except FatalJudgeError as e:
+        sys.exit(f"Evaluation aborted: {e}")
\ No newline at end of file
@@ -88,13 +88,3 @@ argocd app sync payment-processor
 """
         else:
             return "No solution available for this problem."
-
-
-if __name__ == "__main__":
-    # Example usage
-    agent = ExampleAgent()
-    
-    # In real usage, you'd get problem context from the eval framework
-    problem = "k8s-github-secret-failure"
-    solution = agent.solve_problem(problem)
-    print(solution)
\ No newline at end of file
@@ -5,18 +5,79 @@ Cloud Debug Eval - LLM-as-judge evaluation for cloud debugging solutions.
 
 import os
 import json
+import asyncio
+import inspect
+import hashlib
+import mmap
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
 from pathlib import Path
-from dataclasses import dataclass, asdict
-from typing import Dict, List, Optional, Callable
+from dataclasses import dataclass, asdict, field, replace
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
 from datetime import datetime
-from openai import OpenAI
-from dotenv import load_dotenv
+from functools import cached_property, lru_cache
+from statistics import median, pstdev
 
-# Load environment variables from .env file
-load_dotenv()
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 
-@dataclass
+# Files at least this large are memory-mapped rather than read into a buffer
+MMAP_THRESHOLD = 64 * 1024
+
+
+def _list_files(directory: Path, suffix: str) -> List[Path]:
+    """Sorted files in ``directory`` ending with ``suffix``; empty if it is missing.
+
+    ``os.scandir`` reports entry types from the directory listing itself, so
+    filtering costs no extra stat calls.
+    """
+    try:
+        with os.scandir(directory) as entries:
+            return sorted(
+                Path(entry.path)
+                for entry in entries
+                if entry.name.endswith(suffix) and entry.is_file()
+            )
+    except FileNotFoundError:
+        return []
+
+
+def _read_text(path: Path, size: int) -> str:
+    """Read a UTF-8 text file of ``size`` bytes, memory-mapping large ones.
+
+    The caller passes the size it has already stat'ed, so each file costs a
+    single open and read.
+    """
+    with open(path, "rb") as f:
+        if size < MMAP_THRESHOLD:
+            text = f.read().decode("utf-8")
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                text = str(mapped, "utf-8")
+    # Match read_text()'s universal newline handling
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+@dataclass(frozen=True)
 class Problem:
     """Represents a cloud debugging problem."""
 
@@ -29,49 +90,90 @@ class Problem:
 
     @classmethod
     def load(cls, problem_path: Path) -> "Problem":
-        """Load a problem from its directory."""
-        problem_md = (problem_path / "problem.md").read_text()
-        solution_md = (problem_path / "solution.md").read_text()
-
-        # Load all logs
-        logs = {}
-        logs_dir = problem_path / "logs"
-        if logs_dir.exists():
-            for log_file in logs_dir.glob("*.log"):
-                logs[log_file.name] = log_file.read_text()
-
-        # Load all configs
-        configs = {}
-        configs_dir = problem_path / "configs"
-        if configs_dir.exists():
-            for config_file in configs_dir.glob("*.yaml"):
-                configs[config_file.name] = config_file.read_text()
+        """Load a problem from its directory.
+
+        Loads are memoized per directory and invalidated whenever one of the
+        problem's files is added, removed or modified.
+        """
+        problem_path = problem_path.resolve()
+        log_files, config_files = cls._source_files(problem_path)
+        signature = tuple(
+            (str(path), stat.st_mtime_ns, stat.st_size)
+            for path in [
+                problem_path / "problem.md",
+                problem_path / "solution.md",
+                *log_files,
+                *config_files,
+            ]
+            for stat in [path.stat()]
+        )
+        return cls._load_cached(
+            problem_path, tuple(log_files), tuple(config_files), signature
+        )
+
+    @staticmethod
+    def _source_files(problem_path: Path) -> Tuple[List[Path], List[Path]]:
+        """List the log and config files of a problem in a stable order."""
+        return (
+            _list_files(problem_path / "logs", ".log"),
+            _list_files(problem_path / "configs", ".yaml"),
+        )
+
+    @classmethod
+    @lru_cache(maxsize=128)
+    def _load_cached(
+        cls,
+        problem_path: Path,
+        log_files: Tuple[Path, ...],
+        config_files: Tuple[Path, ...],
+        signature: Tuple,
+    ) -> "Problem":
+        """Read a problem's files listed and stat'ed by ``load``.
+
+        ``signature`` holds ``(path, mtime, size)`` for every file in read
+        order; it is the cache key and supplies the sizes.
+        """
+        paths = [Path(path) for path, _, _ in signature]
+        sizes = [size for _, _, size in signature]
+
+        # Files are independent, so read them concurrently
+        with ThreadPoolExecutor(max_workers=min(8, len(paths))) as pool:
+            contents = dict(zip(paths, pool.map(_read_text, paths, sizes)))
 
         return cls(
             name=problem_path.name,
             path=problem_path,
-            problem_md=problem_md,
-            solution_md=solution_md,
-            logs=logs,
-            configs=configs,
+            problem_md=contents[problem_path / "problem.md"],
+            solution_md=contents[problem_path / "solution.md"],
+            logs={path.name: contents[path] for path in log_files},
+            configs={path.name: contents[path] for path in config_files},
         )
 
     def get_context_for_agent(self) -> str:
         """Get formatted context to send to external agent."""
-        context = f"# Cloud Infrastructure Debugging Problem\n\n"
-        context += f"{self.problem_md}\n\n"
+        return self._agent_context
+
+    @cached_property
+    def _agent_context(self) -> str:
+        """Agent context, built once per problem instance."""
+        parts = [
+            "# Cloud Infrastructure Debugging Problem\n\n",
+            f"{self.problem_md}\n\n",
+        ]
 
         if self.logs:
-            context += "## Available Logs\n\n"
+            parts.append("## Available Logs\n\n")
             for log_name, log_content in self.logs.items():
-                context += f"### {log_name}\n```\n{log_content}\n```\n\n"
+                parts.append(f"### {log_name}\n```\n{log_content}\n```\n\n")
 
         if self.configs:
-            context += "## Configuration Files\n\n"
+            parts.append("## Configuration Files\n\n")
             for config_name, config_content in self.configs.items():
-                context += f"### {config_name}\n```yaml\n{config_content}\n```\n\n"
+                parts.append(
+                    f"### {config_name}\n```yaml\n{config_content}\n```\n\n"
+                )
 
-        context += """
+        parts.append("""
 ## Your Task
 As an experienced cloud engineer, analyze this problem and provide:
 
@@ -82,8 +184,8 @@ As an experienced cloud engineer, analyze this problem and provide:
 5. **Prevention**: What measures would prevent this from happening again?
 
 Please be specific with commands, configurations, and procedures.
-"""
-        return context
+""")
+        return "".join(parts)
 
 
 @dataclass
@@ -97,63 +199,210 @@ class EvaluationResult:
     solution_correctness: int  # 0-100
     investigation_quality: int  # 0-100
     overall_score: int  # 0-100
-    agent_solution: str
-    expected_solution: str
+    agent_solution_sha: str  # solution text is stored once under reports/solutions/
+    expected_solution_sha: str
     judge_feedback: str
     judge_reasoning: str
     judge_model: str
+    prompt_tokens: int = 0  # 0 when served from the local judge cache
+    cached_tokens: int = 0  # prompt tokens served from OpenAI's prefix cache
+    sample_scores: List[int] = field(default_factory=list)  # per-sample overall
+    score_stddev: float = 0.0  # spread of sample_scores; high means disagreement
 
 
-class LLMJudge:
-    """LLM-as-judge for evaluating debugging solutions."""
+@dataclass
+class PairwiseResult:
+    """Judge preference between two agents' solutions to one problem."""
 
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o"):
-        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
-        self.model = model
-        self.client = OpenAI(api_key=self.api_key)
+    problem_name: str
+    agent_a: str
+    agent_b: str
+    timestamp: str
+    winner: Optional[str]  # "a", "b" or "tie"; None if judging failed
+    judge_reasoning: str
+    judge_model: str
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    sample_winners: List[str] = field(default_factory=list)
 
-    def evaluate_solution(
-        self, problem: Problem, agent_solution: str, agent_name: str = "unknown"
-    ) -> EvaluationResult:
-        """Evaluate agent solution against expected solution using LLM judge."""
 
-        judge_prompt = self._create_judge_prompt(problem, agent_solution)
+class FatalJudgeError(RuntimeError):
+    """Judge failure that would repeat for every problem, e.g. a bad API key.
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self._get_judge_system_prompt()},
-                    {"role": "user", "content": judge_prompt},
-                ],
-                max_tokens=1500,
-                temperature=0.1,
-            )
+    Evaluation stops at the first one; ``partial_results`` holds the results
+    completed before the run was aborted.
+    """
 
-            judge_response = response.choices[0].message.content
-            return self._parse_judge_response(
-                problem, agent_solution, agent_name, judge_response
-            )
+    def __init__(
+        self,
+        message: str,
+        partial_results: Optional[
+            Union[List[EvaluationResult], List[PairwiseResult]]
+        ] = None,
+    ):
+        super().__init__(message)
+        self.partial_results = partial_results or []
+
+
+class JudgeResponseTruncated(ValueError):
+    """A judge reply hit its ``max_tokens`` budget and is not valid JSON."""
+
+    def __init__(self, max_tokens: int):
+        super().__init__(
+            f"judge response truncated at max_tokens={max_tokens} "
+            f"(JUDGE_MAX_TOKENS={JUDGE_MAX_TOKENS} per judgment and sample)"
+        )
 
-        except Exception as e:
-            return EvaluationResult(
-                problem_name=problem.name,
-                agent_name=agent_name,
-                timestamp=datetime.now().isoformat(),
-                diagnosis_accuracy=0,
-                solution_correctness=0,
-                investigation_quality=0,
-                overall_score=0,
-                agent_solution=agent_solution,
-                expected_solution=problem.solution_md,
-                judge_feedback=f"Error during evaluation: {str(e)}",
-                judge_reasoning="",
-                judge_model=self.model,
-            )
 
-    def _get_judge_system_prompt(self) -> str:
-        """System prompt for LLM judge."""
-        return """You are an expert cloud infrastructure engineer and evaluation judge with 15+ years of experience. 
+def _check_finish_reasons(finish_reasons: List[Optional[str]], max_tokens: int):
+    """Raise ``JudgeResponseTruncated`` if any sampled choice ran out of tokens."""
+    if "length" in finish_reasons:
+        raise JudgeResponseTruncated(max_tokens)
+
+
+T = TypeVar("T")
+
+# Sampling temperature for self-consistency; greedy decoding would make all
+# samples identical
+SELF_CONSISTENCY_TEMPERATURE = 0.7
+
+# Sample std-dev above which the report flags judge disagreement
+DISAGREEMENT_STDDEV = 10.0
+
+# Completion budget per judgment; reasoning and feedback fit well inside it
+JUDGE_MAX_TOKENS = 700
+
+
+def _content_sha(text: str) -> str:
+    """SHA-256 of ``text``, naming its file in the solutions store."""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _with_doubled_budget(request: Dict) -> Dict:
+    """Copy of a judge request with twice its ``max_tokens``."""
+    return {**request, "max_tokens": request["max_tokens"] * 2}
+
+
+def _overall_score(diagnosis: float, solution: float, investigation: float) -> int:
+    """Weighted overall score: diagnosis 40%, solution 40%, investigation 20%."""
+    return int(diagnosis * 0.4 + solution * 0.4 + investigation * 0.2)
+
+
+def _count_outcomes(results: List[PairwiseResult]) -> Tuple[int, int, int]:
+    """Wins for agent A, wins for agent B and ties; failed judgments are skipped."""
+    winners = [result.winner for result in results]
+    return winners.count("a"), winners.count("b"), winners.count("tie")
+
+
+def _format_win_rate(results: List[PairwiseResult]) -> str:
+    """Agent A's win rate, counting a tie as half a win."""
+    wins_a, wins_b, ties = _count_outcomes(results)
+    judged = wins_a + wins_b + ties
+    if not judged:
+        return "n/a"
+    return f"{(wins_a + 0.5 * ties) / judged:.1%} over {judged} problems"
+
+
+def _atomic_write_text(path: Path, text: str):
+    """Write a file via rename so concurrent readers never see partial content."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _split_evenly(total: int, parts: int) -> List[int]:
+    """Split ``total`` into ``parts`` integers that differ by at most one."""
+    share, remainder = divmod(total, parts)
+    return [share + (1 if i < remainder else 0) for i in range(parts)]
+
+
+def _score_property(description: str) -> Dict:
+    return {"type": "integer", "minimum": 0, "maximum": 100, "description": description}
+
+
+_JUDGMENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "diagnosis_accuracy": _score_property(
+            "How well the agent identified the root cause"
+        ),
+        "solution_correctness": _score_property(
+            "How correct and complete the proposed fix is"
+        ),
+        "investigation_quality": _score_property(
+            "How systematic and thorough the debugging methodology is"
+        ),
+        "reasoning": {"type": "string"},
+        "feedback": {"type": "string"},
+    },
+    "required": [
+        "diagnosis_accuracy",
+        "solution_correctness",
+        "investigation_quality",
+        "reasoning",
+        "feedback",
+    ],
+    "additionalProperties": False,
+}
+
+# Structured output schema for judge responses (strict mode)
+JUDGE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "judgment", "strict": True, "schema": _JUDGMENT_SCHEMA},
+}
+
+# List-wise variant: one judgment per numbered problem in a single response
+BATCH_JUDGE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "batch_judgment",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "evaluations": {
+                    "type": "array",
+                    "items": {
+                        **_JUDGMENT_SCHEMA,
+                        "properties": {
+                            "problem_index": {"type": "integer"},
+                            **_JUDGMENT_SCHEMA["properties"],
+                        },
+                        "required": ["problem_index", *_JUDGMENT_SCHEMA["required"]],
+                    },
+                },
+            },
+            "required": ["evaluations"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+# Pairwise preference between two solutions to the same problem
+PAIRWISE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "pairwise_judgment",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "winner": {"type": "string", "enum": ["a", "b", "tie"]},
+                "reasoning": {"type": "string"},
+            },
+            "required": ["winner", "reasoning"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+# Judge prompts are module constants so every request carries byte-identical
+# prefixes, which OpenAI's automatic prompt caching requires to hit
+_JUDGE_SYSTEM_PROMPT = """You are an expert cloud infrastructure engineer and evaluation judge with 15+ years of experience. 
 
 Your task is to evaluate debugging solutions by comparing an agent's solution against the expected solution for cloud infrastructure problems.
 
@@ -178,18 +427,24 @@ Provide your response in this exact JSON format:
     "feedback": "<constructive feedback for improvement>"
 }"""
 
-    def _create_judge_prompt(self, problem: Problem, agent_solution: str) -> str:
-        """Create the evaluation prompt for the judge."""
-        return f"""# Evaluation Task
+_BATCH_JUDGE_SYSTEM_PROMPT = _JUDGE_SYSTEM_PROMPT + """
 
-## Problem Context
-{problem.problem_md}
+You will be given several problems at once, numbered "### Problem 1" to "### Problem K". Evaluate each one independently against its own expected solution. Respond with a JSON object whose "evaluations" array contains one object per problem with the fields above plus "problem_index" (the problem's number)."""
 
-## Expected Solution (Ground Truth)
-{problem.solution_md}
+_PAIRWISE_JUDGE_SYSTEM_PROMPT = """You are an expert cloud infrastructure engineer and evaluation judge with 15+ years of experience.
 
-## Agent's Solution (To Evaluate)
-{agent_solution}
+Your task is to compare two debugging solutions, A and B, for the same cloud infrastructure problem against the expected solution, and decide which one is better overall.
+
+Weigh diagnosis accuracy, solution correctness and investigation quality as a senior engineer reviewing both would. Judge the content, not the length or the order in which the solutions are presented. Declare a tie only when neither solution is meaningfully better.
+
+Provide your response in this exact JSON format:
+{
+    "winner": "<a, b or tie>",
+    "reasoning": "<explanation of the decisive differences>"
+}"""
+
+# Rubric instructions that open every judge prompt, ahead of problem content
+_JUDGE_TASK_INSTRUCTIONS = """# Evaluation Task
 
 ## Your Task
 Compare the agent's solution against the expected solution and evaluate on:
@@ -207,117 +462,1539 @@ Consider:
 
 Score each dimension 0-100 and provide detailed reasoning."""
 
-    def _parse_judge_response(
+
+_PAIRWISE_TASK_INSTRUCTIONS = """# Comparison Task
+
+## Your Task
+Compare Solution A and Solution B against the expected solution and decide which one better:
+
+1. **Diagnosis**: Identifies the actual root cause
+2. **Solution**: Proposes a fix that is technically sound, complete and safe
+3. **Investigation**: Shows systematic debugging methodology
+
+Answer "a", "b" or "tie" and explain the decisive differences."""
+
+
+class JudgeBackend(ABC):
+    """LLM-as-judge for evaluating debugging solutions.
+
+    Handles prompts, caching and score aggregation; subclasses implement
+    ``_complete`` to run a chat request on a particular model backend.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        cache_dir: Path = Path(".judge_cache"),
+        use_cache: bool = True,
+        samples: int = 3,
+    ):
+        # Load environment variables from .env file. Done here rather than at
+        # import time so CLI startup (e.g. --help) does not pay for it
+        from dotenv import load_dotenv
+
+        load_dotenv()
+
+        self.model = model
+        # Self-consistency: each judgment is the median of ``samples``
+        # completions returned by one call that shares the (cached) prompt
+        self.samples = samples
+        self.temperature = 0 if samples == 1 else SELF_CONSISTENCY_TEMPERATURE
+        self.cache_dir = cache_dir
+        # With use_cache off (or JUDGE_NO_CACHE=1) cached entries are not read
+        # but fresh responses still overwrite them, refreshing the cache
+        no_cache = os.getenv("JUDGE_NO_CACHE", "").lower() in ("1", "true", "yes")
+        self.use_cache = use_cache and not no_cache
+
+    def evaluate_solution(
+        self,
+        problem: Problem,
+        agent_solution: str,
+        agent_name: str = "unknown",
+        timestamp: Optional[str] = None,
+    ) -> EvaluationResult:
+        """Evaluate agent solution against expected solution using LLM judge.
+
+        ``timestamp`` is normally the run's start time, shared by all results.
+        """
+        timestamp = timestamp or datetime.now().isoformat()
+        request, parse, hints = self._solution_judgment(
+            problem, agent_solution, agent_name, timestamp
+        )
+        try:
+            return self._cached_completion(request, parse, **hints)
+        except Exception as e:
+            return self._judgment_error(
+                problem, agent_solution, agent_name, e, timestamp
+            )
+
+    async def evaluate_solution_async(
+        self,
+        problem: Problem,
+        agent_solution: str,
+        agent_name: str = "unknown",
+        timestamp: Optional[str] = None,
+    ) -> EvaluationResult:
+        """Async variant of ``evaluate_solution``."""
+        timestamp = timestamp or datetime.now().isoformat()
+        request, parse, hints = self._solution_judgment(
+            problem, agent_solution, agent_name, timestamp
+        )
+        try:
+            return await self._cached_completion_async(request, parse, **hints)
+        except Exception as e:
+            return self._judgment_error(
+                problem, agent_solution, agent_name, e, timestamp
+            )
+
+    def _solution_judgment(
+        self,
+        problem: Problem,
+        agent_solution: str,
+        agent_name: str,
+        timestamp: str,
+    ) -> Tuple[Dict, Callable[[List[str], int, int], EvaluationResult], Dict]:
+        """Request, response parser and routing hints for judging one solution.
+
+        Shared by the sync and async paths so both build identical results.
+        """
+        request = self._build_request(problem, agent_solution)
+
+        def parse(judge_responses: List[str], prompt_tokens: int, cached_tokens: int):
+            return self._parse_judge_response(
+                problem,
+                agent_solution,
+                agent_name,
+                judge_responses,
+                prompt_tokens=prompt_tokens,
+                cached_tokens=cached_tokens,
+                timestamp=timestamp,
+            )
+
+        hints = {
+            "user": agent_name,
+            "prompt_cache_key": f"cloud-debug-eval:{problem.name}",
+        }
+        return request, parse, hints
+
+    def _judgment_error(
         self,
         problem: Problem,
         agent_solution: str,
         agent_name: str,
-        judge_response: str,
+        error: Exception,
+        timestamp: str,
     ) -> EvaluationResult:
-        """Parse judge response and create evaluation result."""
+        """Error result for a failed judgment; fatal errors are re-raised."""
+        if isinstance(error, FatalJudgeError):
+            raise error
+        return self._error_result(
+            problem,
+            agent_solution,
+            agent_name,
+            f"Error during evaluation: {error}",
+            timestamp=timestamp,
+        )
+
+    def evaluate_pairwise(
+        self,
+        problem: Problem,
+        solution_a: str,
+        solution_b: str,
+        agent_a: str = "a",
+        agent_b: str = "b",
+        timestamp: Optional[str] = None,
+    ) -> PairwiseResult:
+        """Judge which of two solutions to ``problem`` is better in one call.
+
+        Cheaper and less noisy than scoring both solutions separately when
+        only the difference between two agents matters. The winner is the
+        majority vote across samples; a split vote is a tie.
+        """
+        timestamp = timestamp or datetime.now().isoformat()
+        request = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": _PAIRWISE_JUDGE_SYSTEM_PROMPT},
+                {
+                    "role": "user",
+                    "content": self._create_pairwise_prompt(
+                        problem, solution_a, solution_b
+                    ),
+                },
+            ],
+            "max_tokens": JUDGE_MAX_TOKENS,
+            "temperature": self.temperature,
+            "n": self.samples,
+            "response_format": PAIRWISE_RESPONSE_FORMAT,
+        }
+
+        def parse(judge_responses: List[str], prompt_tokens: int, cached_tokens: int):
+            judgments = [json.loads(response) for response in judge_responses]
+            sample_winners = [j["winner"] for j in judgments]
+            votes = {w: sample_winners.count(w) for w in ("a", "b", "tie")}
+            winner = max(votes, key=votes.get)
+            if list(votes.values()).count(votes[winner]) > 1:
+                winner = "tie"
+            representative = next(
+                (j for j in judgments if j["winner"] == winner), judgments[0]
+            )
+            return PairwiseResult(
+                problem_name=problem.name,
+                agent_a=agent_a,
+                agent_b=agent_b,
+                timestamp=timestamp,
+                winner=winner,
+                judge_reasoning=representative["reasoning"],
+                judge_model=self.model,
+                prompt_tokens=prompt_tokens,
+                cached_tokens=cached_tokens,
+                sample_winners=sample_winners,
+            )
+
         try:
-            # Try to extract JSON from response
-            start_idx = judge_response.find("{")
-            end_idx = judge_response.rfind("}") + 1
-
-            if start_idx != -1 and end_idx != -1:
-                json_str = judge_response[start_idx:end_idx]
-                judge_data = json.loads(json_str)
-
-                diagnosis = judge_data.get("diagnosis_accuracy", 0)
-                solution = judge_data.get("solution_correctness", 0)
-                investigation = judge_data.get("investigation_quality", 0)
-                reasoning = judge_data.get("reasoning", "No reasoning provided")
-                feedback = judge_data.get("feedback", "No feedback provided")
-
-                # Calculate overall score (weighted average)
-                overall = int(diagnosis * 0.4 + solution * 0.4 + investigation * 0.2)
-
-                return EvaluationResult(
-                    problem_name=problem.name,
-                    agent_name=agent_name,
-                    timestamp=datetime.now().isoformat(),
-                    diagnosis_accuracy=int(diagnosis),
-                    solution_correctness=int(solution),
-                    investigation_quality=int(investigation),
-                    overall_score=overall,
-                    agent_solution=agent_solution,
-                    expected_solution=problem.solution_md,
-                    judge_feedback=feedback,
-                    judge_reasoning=reasoning,
-                    judge_model=self.model,
-                )
-            else:
-                raise ValueError("No JSON found in judge response")
+            return self._cached_completion(
+                request,
+                parse,
+                user=f"{agent_a}-vs-{agent_b}",
+                prompt_cache_key=f"cloud-debug-eval:pairwise:{problem.name}",
+            )
 
+        except FatalJudgeError:
+            raise
         except Exception as e:
-            # Fallback if JSON parsing fails
-            return EvaluationResult(
+            return PairwiseResult(
                 problem_name=problem.name,
-                agent_name=agent_name,
-                timestamp=datetime.now().isoformat(),
-                diagnosis_accuracy=50,
-                solution_correctness=50,
-                investigation_quality=50,
-                overall_score=50,
-                agent_solution=agent_solution,
-                expected_solution=problem.solution_md,
-                judge_feedback=f"Failed to parse judge response: {str(e)}",
-                judge_reasoning=judge_response,
+                agent_a=agent_a,
+                agent_b=agent_b,
+                timestamp=timestamp,
+                winner=None,
+                judge_reasoning=f"Error during comparison: {e}",
                 judge_model=self.model,
             )
 
+    def _build_request(self, problem: Problem, agent_solution: str) -> Dict:
+        """Chat completion parameters for judging a single solution."""
+        judge_prompt = self._create_judge_prompt(problem, agent_solution)
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self._get_judge_system_prompt()},
+                {"role": "user", "content": judge_prompt},
+            ],
+            "max_tokens": JUDGE_MAX_TOKENS,
+            # Greedy decoding for a single sample keeps cached judgments
+            # reproducible; self-consistency needs sampling noise
+            "temperature": self.temperature,
+            "n": self.samples,
+            # Structured outputs guarantee a schema-valid object that ends at
+            # its closing brace, so no extraction or fallback is needed
+            "response_format": JUDGE_RESPONSE_FORMAT,
+        }
+
+    def evaluate_solutions_batch(
+        self, items: List[Tuple[Problem, str, str]], timestamp: Optional[str] = None
+    ) -> List[EvaluationResult]:
+        """Evaluate several solutions with one list-wise judge call.
+
+        ``items`` are ``(problem, agent_solution, agent_name)`` tuples. The
+        rubric is sent once for the whole batch. Raises ``ValueError`` if the
+        judge does not return exactly one judgment per item, so callers can
+        fall back to ``evaluate_solution``.
+        """
+        timestamp = timestamp or datetime.now().isoformat()
+        request = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self._get_batch_judge_system_prompt()},
+                {"role": "user", "content": self._create_batch_judge_prompt(items)},
+            ],
+            "max_tokens": JUDGE_MAX_TOKENS * len(items),
+            "temperature": self.temperature,
+            "n": self.samples,
+            "response_format": BATCH_JUDGE_RESPONSE_FORMAT,
+        }
+
+        def parse(judge_responses: List[str], prompt_tokens: int, cached_tokens: int):
+            samples = []
+            for judge_response in judge_responses:
+                evaluations = json.loads(judge_response)["evaluations"]
+                indices = sorted(e["problem_index"] for e in evaluations)
+                if indices != list(range(1, len(items) + 1)):
+                    raise ValueError(
+                        f"Batch judge returned problem indices {indices} "
+                        f"for {len(items)} problems"
+                    )
+                evaluations.sort(key=lambda e: e["problem_index"])
+                samples.append(evaluations)
+
+            # Token usage is shared by the batch, so split it across results
+            shares = zip(
+                _split_evenly(prompt_tokens, len(items)),
+                _split_evenly(cached_tokens, len(items)),
+            )
+            return [
+                self._result_from_judgments(
+                    problem,
+                    agent_solution,
+                    agent_name,
+                    list(judgments),
+                    prompt_tokens=share_prompt,
+                    cached_tokens=share_cached,
+                    timestamp=timestamp,
+                )
+                for (problem, agent_solution, agent_name), judgments, (
+                    share_prompt,
+                    share_cached,
+                ) in zip(items, zip(*samples), shares)
+            ]
+
+        return self._cached_completion(
+            request,
+            parse,
+            user=items[0][2],
+            prompt_cache_key="cloud-debug-eval:batch",
+        )
+
+    def _cached_completion(
+        self,
+        request: Dict,
+        parse: Callable[[List[str], int, int], T],
+        user: str,
+        prompt_cache_key: str,
+    ) -> T:
+        """Run a judge request through the on-disk cache.
+
+        ``parse`` receives the text of every sampled choice, prompt tokens and
+        cached prompt tokens. Responses are only cached once they parse, so a
+        bad one is retried on the next run. A reply cut off at ``max_tokens``
+        is retried once with twice the budget; a second truncation raises
+        ``JudgeResponseTruncated``.
+        """
+        cache_key = self._cache_key(request)
+        judge_responses = self._cache_get(cache_key)
+        if judge_responses is not None:
+            return parse(judge_responses, 0, 0)
+        try:
+            completion = self._complete(request, user, prompt_cache_key)
+        except JudgeResponseTruncated:
+            completion = self._complete(
+                _with_doubled_budget(request), user, prompt_cache_key
+            )
+        return self._parse_and_cache(cache_key, parse, completion)
+
+    async def _cached_completion_async(
+        self,
+        request: Dict,
+        parse: Callable[[List[str], int, int], T],
+        user: str,
+        prompt_cache_key: str,
+    ) -> T:
+        """Async variant of ``_cached_completion``."""
+        cache_key = self._cache_key(request)
+        judge_responses = self._cache_get(cache_key)
+        if judge_responses is not None:
+            return parse(judge_responses, 0, 0)
+        try:
+            completion = await self._complete_async(request, user, prompt_cache_key)
+        except JudgeResponseTruncated:
+            completion = await self._complete_async(
+                _with_doubled_budget(request), user, prompt_cache_key
+            )
+        return self._parse_and_cache(cache_key, parse, completion)
+
+    def _parse_and_cache(
+        self,
+        cache_key: str,
+        parse: Callable[[List[str], int, int], T],
+        completion: Tuple[List[str], int, int],
+    ) -> T:
+        """Parse a fresh completion and cache its responses once they parse."""
+        judge_responses, prompt_tokens, cached_tokens = completion
+        result = parse(judge_responses, prompt_tokens, cached_tokens)
+        self._cache_put(cache_key, judge_responses)
+        return result
+
+    def _split_cached(
+        self, items: List[Tuple[Problem, str, str]], timestamp: str
+    ) -> Tuple[List[Optional[EvaluationResult]], List[Tuple[int, Dict, str]]]:
+        """Answer ``items`` from the judge cache where possible.
+
+        Returns a result per item (None for cache misses) and
+        ``(index, request, cache_key)`` for every miss, for callers that send
+        the misses in one bulk call.
+        """
+        results: List[Optional[EvaluationResult]] = [None] * len(items)
+        misses = []
+        for index, (problem, agent_solution, agent_name) in enumerate(items):
+            request = self._build_request(problem, agent_solution)
+            cache_key = self._cache_key(request)
+            judge_responses = self._cache_get(cache_key)
+            if judge_responses is not None:
+                results[index] = self._parse_judge_response(
+                    problem,
+                    agent_solution,
+                    agent_name,
+                    judge_responses,
+                    timestamp=timestamp,
+                )
+            else:
+                misses.append((index, request, cache_key))
+        return results, misses
+
+    @abstractmethod
+    def _complete(
+        self, request: Dict, user: str, prompt_cache_key: str
+    ) -> Tuple[List[str], int, int]:
+        """Run a chat request built by ``_build_request``.
+
+        Returns the text of every sampled choice, prompt tokens and cached
+        prompt tokens. ``user`` and ``prompt_cache_key`` are routing hints
+        that backends may ignore. Raises ``JudgeResponseTruncated`` when a
+        choice stops at ``max_tokens``.
+        """
+
+    async def _complete_async(
+        self, request: Dict, user: str, prompt_cache_key: str
+    ) -> Tuple[List[str], int, int]:
+        """Async ``_complete``; runs the blocking call in a worker thread."""
+        return await asyncio.to_thread(
+            self._complete, request, user, prompt_cache_key
+        )
+
+    def _cache_key(self, request: Dict) -> str:
+        """Content hash of a judge request (model, prompts and sampling params)."""
+        payload = json.dumps(request, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[List[str]]:
+        """Return the cached sampled judge responses, or None on a miss."""
+        if not self.use_cache:
+            return None
+        cache_file = self.cache_dir / f"{key}.json"
+        if not cache_file.exists():
+            return None
+        return json.loads(cache_file.read_text())
+
+    def _cache_put(self, key: str, judge_responses: List[str]):
+        """Store judge responses atomically so readers never see partial files."""
+        _atomic_write_text(self.cache_dir / f"{key}.json", json.dumps(judge_responses))
+
+    def _get_judge_system_prompt(self) -> str:
+        """System prompt for LLM judge."""
+        return _JUDGE_SYSTEM_PROMPT
+
+    def _get_batch_judge_system_prompt(self) -> str:
+        """System prompt for list-wise judging."""
+        return _BATCH_JUDGE_SYSTEM_PROMPT
+
+    def _create_judge_prompt(self, problem: Problem, agent_solution: str) -> str:
+        """Create the evaluation prompt for the judge.
+
+        Invariant instructions come first and the agent's solution last, so
+        repeated judgments share the longest possible prefix for OpenAI's
+        automatic prompt caching.
+        """
+        return _JUDGE_TASK_INSTRUCTIONS + f"""
+
+## Problem Context
+{problem.problem_md}
+
+## Expected Solution (Ground Truth)
+{problem.solution_md}
+
+## Agent's Solution (To Evaluate)
+{agent_solution}"""
+
+    def _create_batch_judge_prompt(self, items: List[Tuple[Problem, str, str]]) -> str:
+        """Create one list-wise prompt covering every item in a batch."""
+        parts = [_JUDGE_TASK_INSTRUCTIONS]
+        for index, (problem, agent_solution, _) in enumerate(items, start=1):
+            parts.append(f"""### Problem {index}
+
+#### Problem Context
+{problem.problem_md}
+
+#### Expected Solution (Ground Truth)
+{problem.solution_md}
+
+#### Agent's Solution (To Evaluate)
+{agent_solution}""")
+        return "\n\n".join(parts)
+
+    def _create_pairwise_prompt(
+        self, problem: Problem, solution_a: str, solution_b: str
+    ) -> str:
+        """Create the comparison prompt; instructions first for prompt caching."""
+        return _PAIRWISE_TASK_INSTRUCTIONS + f"""
+
+## Problem Context
+{problem.problem_md}
+
+## Expected Solution (Ground Truth)
+{problem.solution_md}
+
+## Solution A
+{solution_a}
+
+## Solution B
+{solution_b}"""
+
+    def _error_result(
+        self,
+        problem: Problem,
+        agent_solution: str,
+        agent_name: str,
+        message: str,
+        timestamp: str,
+    ) -> EvaluationResult:
+        """Zero-score result recording why a judgment could not be made."""
+        return EvaluationResult(
+            problem_name=problem.name,
+            agent_name=agent_name,
+            timestamp=timestamp,
+            diagnosis_accuracy=0,
+            solution_correctness=0,
+            investigation_quality=0,
+            overall_score=0,
+            agent_solution_sha=_content_sha(agent_solution),
+            expected_solution_sha=_content_sha(problem.solution_md),
+            judge_feedback=message,
+            judge_reasoning="",
+            judge_model=self.model,
+        )
+
+    def _parse_judge_response(
+        self,
+        problem: Problem,
+        agent_solution: str,
+        agent_name: str,
+        judge_responses: List[str],
+        timestamp: str,
+        prompt_tokens: int = 0,
+        cached_tokens: int = 0,
+    ) -> EvaluationResult:
+        """Parse schema-constrained judge samples into an evaluation result."""
+        return self._result_from_judgments(
+            problem,
+            agent_solution,
+            agent_name,
+            [json.loads(judge_response) for judge_response in judge_responses],
+            prompt_tokens=prompt_tokens,
+            cached_tokens=cached_tokens,
+            timestamp=timestamp,
+        )
+
+    def _result_from_judgments(
+        self,
+        problem: Problem,
+        agent_solution: str,
+        agent_name: str,
+        judgments: List[Dict],
+        timestamp: str,
+        prompt_tokens: int = 0,
+        cached_tokens: int = 0,
+    ) -> EvaluationResult:
+        """Aggregate sampled judgments into an evaluation result.
+
+        Each sub-score is the median across samples. The feedback and
+        reasoning come from the sample whose overall score is closest to the
+        aggregate.
+        """
+        diagnosis = round(median(j["diagnosis_accuracy"] for j in judgments))
+        solution = round(median(j["solution_correctness"] for j in judgments))
+        investigation = round(median(j["investigation_quality"] for j in judgments))
+        overall = _overall_score(diagnosis, solution, investigation)
+
+        sample_scores = [
+            _overall_score(
+                j["diagnosis_accuracy"],
+                j["solution_correctness"],
+                j["investigation_quality"],
+            )
+            for j in judgments
+        ]
+        representative = judgments[
+            min(
+                range(len(judgments)),
+                key=lambda i: abs(sample_scores[i] - overall),
+            )
+        ]
+
+        return EvaluationResult(
+            problem_name=problem.name,
+            agent_name=agent_name,
+            timestamp=timestamp,
+            diagnosis_accuracy=diagnosis,
+            solution_correctness=solution,
+            investigation_quality=investigation,
+            overall_score=overall,
+            agent_solution_sha=_content_sha(agent_solution),
+            expected_solution_sha=_content_sha(problem.solution_md),
+            judge_feedback=representative["feedback"],
+            judge_reasoning=representative["reasoning"],
+            judge_model=self.model,
+            prompt_tokens=prompt_tokens,
+            cached_tokens=cached_tokens,
+            sample_scores=sample_scores,
+            score_stddev=round(pstdev(sample_scores), 1),
+        )
+
+
+class OpenAIJudge(JudgeBackend):
+    """Judge backed by the OpenAI chat completions API."""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "gpt-4o",
+        max_retries: int = 5,
+        cache_dir: Path = Path(".judge_cache"),
+        use_cache: bool = True,
+        samples: int = 3,
+    ):
+        super().__init__(
+            model, cache_dir=cache_dir, use_cache=use_cache, samples=samples
+        )
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.max_retries = max_retries
+        # Imported here because the SDK is slow to import and only needed for
+        # OpenAI judges
+        from openai import OpenAI
+
+        # The SDK retries 429/5xx/connection errors with jittered exponential backoff
+        self.client = OpenAI(api_key=self.api_key, max_retries=max_retries)
+
+    def evaluate_solutions_offline(
+        self,
+        items: List[Tuple[Problem, str, str]],
+        work_dir: Path,
+        timestamp: Optional[str] = None,
+        poll_interval: float = 10.0,
+        max_poll_interval: float = 300.0,
+    ) -> List[EvaluationResult]:
+        """Evaluate solutions through the OpenAI Batch API.
+
+        Trades latency (up to 24h) for half-price judge calls, which suits
+        nightly or regression sweeps. Items already in the judge cache are
+        answered locally; the rest are written to a JSONL file in
+        ``work_dir``, uploaded and polled with exponential backoff until the
+        batch finishes. A batch that fails, expires or is cancelled raises
+        ``FatalJudgeError`` with the items it did answer as partial results.
+        """
+        timestamp = timestamp or datetime.now().isoformat()
+        results, misses = self._split_cached(items, timestamp)
+        pending = {f"item-{miss[0]}": miss for miss in misses}
+
+        if pending:
+            work_dir.mkdir(parents=True, exist_ok=True)
+            input_path = work_dir / (
+                f"batch_input_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+            )
+            with open(input_path, "w") as f:
+                for custom_id, (index, request, _) in pending.items():
+                    problem, _, agent_name = items[index]
+                    body = {
+                        **request,
+                        "user": agent_name,
+                        "prompt_cache_key": f"cloud-debug-eval:{problem.name}",
+                    }
+                    line = {
+                        "custom_id": custom_id,
+                        "method": "POST",
+                        "url": "/v1/chat/completions",
+                        "body": body,
+                    }
+                    f.write(json.dumps(line) + "\n")
+
+            with self._fatal_api_errors():
+                batch, outputs = self._run_batch(
+                    input_path, poll_interval, max_poll_interval
+                )
+
+            for custom_id, (index, request, cache_key) in pending.items():
+                problem, agent_solution, agent_name = items[index]
+                entry = outputs.get(custom_id)
+                if entry is None:
+                    # Left unanswered by a batch that did not complete
+                    continue
+                response = entry.get("response") or {}
+                if response.get("status_code") != 200:
+                    error = entry.get("error") or response.get("body")
+                    results[index] = self._error_result(
+                        problem,
+                        agent_solution,
+                        agent_name,
+                        f"Error during evaluation: {error}",
+                        timestamp=timestamp,
+                    )
+                    continue
+
+                body = response["body"]
+                judge_responses = [
+                    choice["message"]["content"] for choice in body["choices"]
+                ]
+                usage = body.get("usage") or {}
+                details = usage.get("prompt_tokens_details") or {}
+                try:
+                    _check_finish_reasons(
+                        [choice.get("finish_reason") for choice in body["choices"]],
+                        request["max_tokens"],
+                    )
+                    results[index] = self._parse_judge_response(
+                        problem,
+                        agent_solution,
+                        agent_name,
+                        judge_responses,
+                        prompt_tokens=usage.get("prompt_tokens", 0),
+                        cached_tokens=details.get("cached_tokens") or 0,
+                        timestamp=timestamp,
+                    )
+                except Exception as e:
+                    results[index] = self._error_result(
+                        problem,
+                        agent_solution,
+                        agent_name,
+                        f"Error during evaluation: {e}",
+                        timestamp=timestamp,
+                    )
+                    continue
+                self._cache_put(cache_key, judge_responses)
+
+            if batch.status != "completed":
+                raise FatalJudgeError(
+                    f"Batch {batch.id} {batch.status}: {self._batch_errors(batch)}",
+                    partial_results=[r for r in results if r is not None],
+                )
+            for index, _, _ in misses:
+                if results[index] is None:
+                    problem, agent_solution, agent_name = items[index]
+                    results[index] = self._error_result(
+                        problem,
+                        agent_solution,
+                        agent_name,
+                        "Error during evaluation: missing from batch output",
+                        timestamp=timestamp,
+                    )
+
+        return results
+
+    def _run_batch(
+        self, input_path: Path, poll_interval: float, max_poll_interval: float
+    ) -> Tuple[Any, Dict[str, Dict]]:
+        """Upload a batch input file and wait for it to finish.
+
+        Returns the final batch object and the output and error file lines
+        keyed by custom_id.
+        """
+        with open(input_path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        print(f"Submitted batch {batch.id} from {input_path.name}")
+
+        delay = poll_interval
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            time.sleep(delay)
+            delay = min(delay * 2, max_poll_interval)
+            batch = self.client.batches.retrieve(batch.id)
+            print(f"Batch {batch.id}: {batch.status}")
+
+        # Successful requests go to the output file, failed ones to the error file
+        outputs = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if line.strip():
+                    entry = json.loads(line)
+                    outputs[entry["custom_id"]] = entry
+        return batch, outputs
+
+    @staticmethod
+    def _batch_errors(batch) -> str:
+        """Describe the batch-level errors of a batch that did not complete."""
+        errors = getattr(batch, "errors", None)
+        data = (errors.data if errors else None) or []
+        if not data:
+            return "no errors reported"
+        return "; ".join(
+            f"{error.code}: {error.message}"
+            + (f" (line {error.line})" if error.line is not None else "")
+            for error in data
+        )
+
+    @contextmanager
+    def _fatal_api_errors(self):
+        """Turn errors that every later call would repeat into ``FatalJudgeError``.
+
+        Rate limits only get here once the SDK has exhausted its retries.
+        """
+        from openai import AuthenticationError, RateLimitError
+
+        try:
+            yield
+        except (AuthenticationError, RateLimitError) as e:
+            raise FatalJudgeError(f"{type(e).__name__}: {e}") from e
+
+    def _complete(
+        self, request: Dict, user: str, prompt_cache_key: str
+    ) -> Tuple[List[str], int, int]:
+        # Routing hints stay out of the cache key so that different agents
+        # with identical solutions share cache entries
+        with self._fatal_api_errors():
+            response = self.client.chat.completions.create(
+                **request,
+                user=user,
+                extra_body={"prompt_cache_key": prompt_cache_key},
+            )
+        return self._completion(response, request["max_tokens"])
+
+    async def _complete_async(
+        self, request: Dict, user: str, prompt_cache_key: str
+    ) -> Tuple[List[str], int, int]:
+        with self._fatal_api_errors():
+            response = await self.async_client.chat.completions.create(
+                **request,
+                user=user,
+                extra_body={"prompt_cache_key": prompt_cache_key},
+            )
+        return self._completion(response, request["max_tokens"])
+
+    @cached_property
+    def async_client(self) -> "AsyncOpenAI":
+        """Async client, created on first use so sync-only runs never build it."""
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(api_key=self.api_key, max_retries=self.max_retries)
+
+    @classmethod
+    def _completion(cls, response, max_tokens: int) -> Tuple[List[str], int, int]:
+        """Sampled texts and token usage of a chat completion response."""
+        _check_finish_reasons(
+            [choice.finish_reason for choice in response.choices], max_tokens
+        )
+        judge_responses = [choice.message.content for choice in response.choices]
+        return judge_responses, *cls._usage_tokens(response)
+
+    @staticmethod
+    def _usage_tokens(response) -> Tuple[int, int]:
+        """Return (prompt_tokens, cached_tokens) from a chat completion response."""
+        usage = response.usage
+        if usage is None:
+            return 0, 0
+        details = usage.prompt_tokens_details
+        cached_tokens = (details.cached_tokens or 0) if details else 0
+        return usage.prompt_tokens, cached_tokens
+
+
+# Backwards-compatible name for the default judge
+LLMJudge = OpenAIJudge
+
+# Short names accepted after the ``local:`` judge model prefix
+LOCAL_JUDGE_ALIASES = {
+    "prometheus-7b": "prometheus-eval/prometheus-7b-v2.0",
+    "prometheus-8x7b": "prometheus-eval/prometheus-8x7b-v2.0",
+}
+
+
+class LocalJudge(JudgeBackend):
+    """Judge running an open-source model on local GPUs through vLLM.
+
+    Needs the optional ``vllm`` package. ``tensor_parallel_size`` defaults
+    to ``JUDGE_TENSOR_PARALLEL_SIZE`` (or 1).
+    """
+
+    def __init__(
+        self,
+        model: str = "prometheus-eval/prometheus-7b-v2.0",
+        tensor_parallel_size: Optional[int] = None,
+        cache_dir: Path = Path(".judge_cache"),
+        use_cache: bool = True,
+        samples: int = 3,
+    ):
+        try:
+            from vllm import LLM
+        except ImportError as e:
+            raise ImportError("LocalJudge requires vLLM: pip install vllm") from e
+
+        model = LOCAL_JUDGE_ALIASES.get(model, model)
+        super().__init__(
+            model, cache_dir=cache_dir, use_cache=use_cache, samples=samples
+        )
+        if tensor_parallel_size is None:
+            tensor_parallel_size = int(os.getenv("JUDGE_TENSOR_PARALLEL_SIZE", "1"))
+        self.llm = LLM(model=model, tensor_parallel_size=tensor_parallel_size)
+        # vLLM engines are not thread-safe; evaluator workers take turns
+        self._generate_lock = threading.Lock()
+
+    def evaluate_solutions_batch(
+        self, items: List[Tuple[Problem, str, str]], timestamp: Optional[str] = None
+    ) -> List[EvaluationResult]:
+        """Judge every item pointwise in a single vLLM ``chat`` call.
+
+        Unlike the list-wise OpenAI prompt, each item keeps its own
+        conversation; vLLM's continuous batching schedules them together on
+        the GPU.
+        """
+        timestamp = timestamp or datetime.now().isoformat()
+        results, pending = self._split_cached(items, timestamp)
+
+        if pending:
+            outputs = self._generate([request for _, request, _ in pending])
+            for (index, _, cache_key), output in zip(pending, outputs):
+                problem, agent_solution, agent_name = items[index]
+                judge_responses, prompt_tokens, cached_tokens = output
+                results[index] = self._parse_judge_response(
+                    problem,
+                    agent_solution,
+                    agent_name,
+                    judge_responses,
+                    prompt_tokens=prompt_tokens,
+                    cached_tokens=cached_tokens,
+                    timestamp=timestamp,
+                )
+                self._cache_put(cache_key, judge_responses)
+
+        return results
+
+    def _complete(
+        self, request: Dict, user: str, prompt_cache_key: str
+    ) -> Tuple[List[str], int, int]:
+        return self._generate([request])[0]
+
+    def _generate(self, requests: List[Dict]) -> List[Tuple[List[str], int, int]]:
+        """Run requests sharing the same sampling parameters in one vLLM call."""
+        from vllm import SamplingParams
+        from vllm.sampling_params import GuidedDecodingParams
+
+        request = requests[0]
+        sampling_params = SamplingParams(
+            n=request["n"],
+            temperature=request["temperature"],
+            max_tokens=request["max_tokens"],
+            # Constrain decoding to the same schema OpenAI enforces
+            guided_decoding=GuidedDecodingParams(
+                json=request["response_format"]["json_schema"]["schema"]
+            ),
+        )
+        # Many open judge models' chat templates reject a system role
+        conversations = [
+            [
+                {
+                    "role": "user",
+                    "content": "\n\n".join(m["content"] for m in r["messages"]),
+                }
+            ]
+            for r in requests
+        ]
+
+        with self._generate_lock:
+            outputs = self.llm.chat(conversations, sampling_params, use_tqdm=False)
+
+        for output in outputs:
+            _check_finish_reasons(
+                [completion.finish_reason for completion in output.outputs],
+                request["max_tokens"],
+            )
+
+        return [
+            (
+                [completion.text for completion in output.outputs],
+                len(output.prompt_token_ids),
+                getattr(output, "num_cached_tokens", None) or 0,
+            )
+            for output in outputs
+        ]
+
+
+def create_judge(
+    judge_model: str, api_key: Optional[str] = None, **kwargs
+) -> JudgeBackend:
+    """Create a judge from a ``backend:model`` string.
+
+    ``local:prometheus-7b`` runs a local vLLM judge; ``openai:gpt-4o`` or any
+    other model name (including ``ft:...`` fine-tunes) uses the OpenAI API.
+    """
+    backend, _, model = judge_model.partition(":")
+    if backend == "local":
+        return LocalJudge(model, **kwargs)
+    if backend != "openai":
+        model = judge_model
+    return OpenAIJudge(api_key, model, **kwargs)
+
+
+class ResultsStore:
+    """SQLite table of evaluation scores across agents and runs.
+
+    Aggregation (report summaries, cross-run comparisons) is done in SQL so
+    it stays fast as results accumulate. Safe to share between threads.
+    """
+
+    def __init__(self, db_path: Path):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS results (
+                    problem TEXT NOT NULL,
+                    agent TEXT NOT NULL,
+                    run_ts TEXT NOT NULL,
+                    diagnosis INTEGER NOT NULL,
+                    solution INTEGER NOT NULL,
+                    investigation INTEGER NOT NULL,
+                    overall INTEGER NOT NULL,
+                    judge_model TEXT NOT NULL,
+                    UNIQUE (problem, agent, run_ts)
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS results_agent_run "
+                "ON results (agent, run_ts)"
+            )
+
+    def add(self, results: List[EvaluationResult]):
+        """Insert results, replacing earlier rows for the same problem and run."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        r.problem_name,
+                        r.agent_name,
+                        r.timestamp,
+                        r.diagnosis_accuracy,
+                        r.solution_correctness,
+                        r.investigation_quality,
+                        r.overall_score,
+                        r.judge_model,
+                    )
+                    for r in results
+                ],
+            )
+
+    def summary(self, results: List[EvaluationResult]) -> List[Tuple]:
+        """Per-problem ``(problem, overall, diagnosis, solution, investigation)``.
+
+        Only rows matching the ``(problem, agent, run_ts)`` of ``results`` are
+        aggregated, so a report covers exactly the results it was given.
+        """
+        keys_sql, params = self._keys_cte(results)
+        with self._lock:
+            return self._conn.execute(
+                keys_sql
+                + """SELECT problem, AVG(overall), AVG(diagnosis), AVG(solution),
+                            AVG(investigation)
+                     FROM results JOIN keys USING (problem, agent, run_ts)
+                     GROUP BY problem ORDER BY problem""",
+                params,
+            ).fetchall()
+
+    def average(self, results: List[EvaluationResult]) -> Tuple[int, float]:
+        """Number of stored rows among ``results`` and their average overall score."""
+        keys_sql, params = self._keys_cte(results)
+        with self._lock:
+            count, average = self._conn.execute(
+                keys_sql
+                + "SELECT COUNT(*), AVG(overall) "
+                "FROM results JOIN keys USING (problem, agent, run_ts)",
+                params,
+            ).fetchone()
+        return count, average or 0.0
+
+    @staticmethod
+    def _keys_cte(results: List[EvaluationResult]) -> Tuple[str, List[str]]:
+        """``WITH keys(...)`` clause listing the distinct keys of ``results``."""
+        keys = list(
+            dict.fromkeys((r.problem_name, r.agent_name, r.timestamp) for r in results)
+        )
+        values = ", ".join(["(?, ?, ?)"] * len(keys))
+        params = [value for key in keys for value in key]
+        return f"WITH keys(problem, agent, run_ts) AS (VALUES {values}) ", params
+
+    def compare_latest(self, agent_a: str, agent_b: str) -> List[Tuple]:
+        """``(problem, overall_a, overall_b)`` for problems in both latest runs."""
+        with self._lock:
+            return self._conn.execute(
+                """SELECT a.problem, a.overall, b.overall
+                   FROM results a JOIN results b ON a.problem = b.problem
+                   WHERE a.agent = ?1
+                     AND a.run_ts = (SELECT MAX(run_ts) FROM results WHERE agent = ?1)
+                     AND b.agent = ?2
+                     AND b.run_ts = (SELECT MAX(run_ts) FROM results WHERE agent = ?2)
+                   ORDER BY a.problem""",
+                (agent_a, agent_b),
+            ).fetchall()
+
+    def close(self):
+        self._conn.close()
+
 
 class CloudDebugEvaluator:
     """Main evaluator orchestrator."""
 
-    def __init__(self, api_key: Optional[str] = None, judge_model: str = "gpt-4"):
-        self.judge = LLMJudge(api_key, judge_model)
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        judge_model: str = "gpt-4o",
+        max_workers: int = 16,
+        use_cache: bool = True,
+        judge_batch_size: int = 1,
+        agent_workers: Optional[int] = None,
+        judge_samples: int = 3,
+    ):
+        # Each judgment is the median of ``judge_samples`` sampled completions;
+        # output-token cost grows linearly with it
+        self.judge = create_judge(
+            judge_model, api_key, use_cache=use_cache, samples=judge_samples
+        )
         self.problems_dir = Path("problems")
         self.reports_dir = Path("reports")
+        # Finished results keyed by problem and solution hash
+        self.results_cache_dir = self.reports_dir / ".cache"
+        # Agent and expected solutions, one file per distinct text
+        self.solutions_dir = self.reports_dir / "solutions"
+        # Scores of every run, for SQL aggregation and cross-run comparison
+        self.results_store = ResultsStore(self.reports_dir / "results.db")
+        # Judge threads; agents get their own pool so the two stages overlap
+        self.max_workers = max_workers
+        self.agent_workers = agent_workers or max_workers
+        # Problems per list-wise judge call; keep within the judge's context window
+        self.judge_batch_size = judge_batch_size
 
     def evaluate_with_agent(
         self,
         problem_name: str,
         agent_function: Callable[[str], str],
         agent_name: str = "unknown",
+        run_timestamp: Optional[str] = None,
     ) -> EvaluationResult:
         """Evaluate a problem by running agent and then judging the result."""
-        problem_path = self.problems_dir / problem_name
-        problem = Problem.load(problem_path)
-
-        # Get problem context for agent
-        problem_context = problem.get_context_for_agent()
+        problem, agent_solution = self._run_agent(
+            problem_name, agent_function, agent_name
+        )
 
-        # Run external agent
-        print(f"Running agent '{agent_name}' on problem '{problem.name}'...")
-        agent_solution = agent_function(problem_context)
+        # Skip the judge entirely if this exact solution was judged before
+        cached = self._load_cached_result(
+            problem, agent_solution, agent_name, run_timestamp
+        )
+        if cached is not None:
+            print(f"Reusing cached result for problem '{problem.name}'")
+            self.results_store.add([cached])
+            return cached
 
         # Evaluate with judge
         print(f"Evaluating solution with {self.judge.model} judge...")
-        result = self.judge.evaluate_solution(problem, agent_solution, agent_name)
+        result = self.judge.evaluate_solution(
+            problem, agent_solution, agent_name, run_timestamp
+        )
+        self._store_result(problem, agent_solution, result)
+        self.results_store.add([result])
 
         return result
 
     def evaluate_all_problems(
-        self, agent_function: Callable[[str], str], agent_name: str = "unknown"
+        self,
+        agent_function: Callable[[str], str],
+        agent_name: str = "unknown",
+        run_timestamp: Optional[str] = None,
     ) -> List[EvaluationResult]:
-        """Evaluate all problems with given agent."""
-        results = []
-        for problem_dir in self.problems_dir.iterdir():
-            if problem_dir.is_dir() and (problem_dir / "problem.md").exists():
-                result = self.evaluate_with_agent(
-                    problem_dir.name, agent_function, agent_name
+        """Evaluate all problems with given agent.
+
+        Agents run on a pool of ``agent_workers`` threads and judging on a
+        separate pool of ``max_workers`` threads, so each solution is judged
+        while the agent is still working on later problems. ``agent_function``
+        must be safe to call from multiple threads. With
+        ``judge_batch_size > 1`` solutions are judged in chunks with a single
+        list-wise call each. All results share ``run_timestamp``, which
+        defaults to the time of this call.
+        """
+        run_timestamp = run_timestamp or datetime.now().isoformat()
+        problem_names = self._problem_names()
+
+        results, items = [], []
+
+        def record(new_results: List[EvaluationResult]):
+            self.results_store.add(new_results)
+            for result in new_results:
+                results.append(result)
+                print(
+                    f"[{len(results)}/{len(problem_names)}] "
+                    f"{result.problem_name}: {result.overall_score}/100"
                 )
+
+        with (
+            ThreadPoolExecutor(max_workers=self.agent_workers) as agent_pool,
+            ThreadPoolExecutor(max_workers=self.max_workers) as judge_pool,
+        ):
+            agent_futures = {
+                agent_pool.submit(
+                    self._run_agent, problem_name, agent_function, agent_name
+                )
+                for problem_name in problem_names
+            }
+            pending = set(agent_futures)
+            try:
+                # Route finished agents to the judge pool and finished judge
+                # chunks to the results, whichever completes first
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future not in agent_futures:
+                            record(future.result())
+                            continue
+
+                        problem, agent_solution = future.result()
+                        cached = self._load_cached_result(
+                            problem, agent_solution, agent_name, run_timestamp
+                        )
+                        if cached is not None:
+                            print(f"Reusing cached result for problem '{problem.name}'")
+                            record([cached])
+                            continue
+
+                        items.append((problem, agent_solution, agent_name))
+                        if len(items) >= self.judge_batch_size:
+                            pending.add(
+                                judge_pool.submit(
+                                    self._judge_items, items, run_timestamp
+                                )
+                            )
+                            items = []
+
+                    # Once every agent has finished, judge the partial chunk,
+                    # whether the last agent was a cache hit or a miss
+                    agents_done = not any(f in agent_futures for f in pending)
+                    if items and agents_done:
+                        pending.add(
+                            judge_pool.submit(self._judge_items, items, run_timestamp)
+                        )
+                        items = []
+            except FatalJudgeError as e:
+                # Every remaining call would fail the same way
+                agent_pool.shutdown(wait=False, cancel_futures=True)
+                judge_pool.shutdown(wait=False, cancel_futures=True)
+                e.partial_results = sorted(results, key=lambda r: r.problem_name)
+                raise
+
+        # Keep report ordering stable regardless of completion order
+        results.sort(key=lambda r: r.problem_name)
+        return results
+
+    def evaluate_all_problems_batch(
+        self,
+        agent_function: Callable[[str], str],
+        agent_name: str = "unknown",
+        run_timestamp: Optional[str] = None,
+    ) -> List[EvaluationResult]:
+        """Evaluate all problems, judging them through the OpenAI Batch API.
+
+        Agents still run concurrently; judging is submitted as one offline
+        batch at half the price of synchronous calls, so this can take hours.
+        """
+        if not isinstance(self.judge, OpenAIJudge):
+            raise ValueError(
+                f"The Batch API requires an OpenAI judge, not '{self.judge.model}'"
+            )
+        problem_names = self._problem_names()
+
+        with ThreadPoolExecutor(max_workers=self.agent_workers) as pool:
+            solved = list(
+                pool.map(
+                    lambda problem_name: self._run_agent(
+                        problem_name, agent_function, agent_name
+                    ),
+                    problem_names,
+                )
+            )
+
+        results, items = [], []
+        for problem, agent_solution in solved:
+            cached = self._load_cached_result(
+                problem, agent_solution, agent_name, run_timestamp
+            )
+            if cached is not None:
+                results.append(cached)
+            else:
+                items.append((problem, agent_solution, agent_name))
+
+        if items:
+            print(
+                f"Submitting {len(items)} solutions to the {self.judge.model} "
+                "batch judge..."
+            )
+            try:
+                judged = self.judge.evaluate_solutions_offline(
+                    items, self.reports_dir / "batches", timestamp=run_timestamp
+                )
+            except FatalJudgeError as e:
+                # Items judged before a failed batch stopped are kept alongside
+                # the cached ones
+                e.partial_results = sorted(
+                    results + e.partial_results, key=lambda r: r.problem_name
+                )
+                raise
+            for (problem, agent_solution, _), result in zip(items, judged):
+                self._store_result(problem, agent_solution, result)
+            results.extend(judged)
+
+        self.results_store.add(results)
+        results.sort(key=lambda r: r.problem_name)
+        return results
+
+    async def evaluate_all_problems_async(
+        self,
+        agent_function: Callable[[str], Union[str, Awaitable[str]]],
+        agent_name: str = "unknown",
+        run_timestamp: Optional[str] = None,
+        max_concurrency: int = 64,
+    ) -> List[EvaluationResult]:
+        """Evaluate all problems on an event loop instead of a thread pool.
+
+        Judge calls share one ``AsyncOpenAI`` client and at most
+        ``max_concurrency`` problems are in flight at once. Coroutine agents
+        are awaited directly; plain functions run in worker threads.
+        """
+        run_timestamp = run_timestamp or datetime.now().isoformat()
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def evaluate_one(problem_name: str) -> EvaluationResult:
+            async with semaphore:
+                problem = await asyncio.to_thread(
+                    Problem.load, self.problems_dir / problem_name
+                )
+                problem_context = problem.get_context_for_agent()
+
+                print(f"Running agent '{agent_name}' on problem '{problem.name}'...")
+                if inspect.iscoroutinefunction(agent_function):
+                    agent_solution = await agent_function(problem_context)
+                else:
+                    agent_solution = await asyncio.to_thread(
+                        agent_function, problem_context
+                    )
+                await asyncio.to_thread(self._save_solutions, problem, agent_solution)
+
+                cached = self._load_cached_result(
+                    problem, agent_solution, agent_name, run_timestamp
+                )
+                if cached is not None:
+                    print(f"Reusing cached result for problem '{problem.name}'")
+                    return cached
+
+                print(f"Evaluating solution with {self.judge.model} judge...")
+                result = await self.judge.evaluate_solution_async(
+                    problem, agent_solution, agent_name, run_timestamp
+                )
+                self._store_result(problem, agent_solution, result)
+                return result
+
+        tasks = [
+            asyncio.create_task(evaluate_one(problem_name))
+            for problem_name in self._problem_names()
+        ]
+        results = []
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                result = await next_result
+                self.results_store.add([result])
                 results.append(result)
+        except FatalJudgeError as e:
+            for task in tasks:
+                task.cancel()
+            e.partial_results = sorted(results, key=lambda r: r.problem_name)
+            raise
+
+        results.sort(key=lambda r: r.problem_name)
+        return results
+
+    def compare_agents(
+        self,
+        agent_a_function: Callable[[str], str],
+        agent_b_function: Callable[[str], str],
+        agent_a_name: str = "a",
+        agent_b_name: str = "b",
+        run_timestamp: Optional[str] = None,
+    ) -> List[PairwiseResult]:
+        """Compare two agents on every problem with one pairwise judge call each.
+
+        Suited to regression testing (v2 against v1), where a preference needs
+        fewer samples than two absolute scores to show a real difference.
+        Problems run concurrently on the thread pool, as in
+        ``evaluate_all_problems``.
+        """
+        run_timestamp = run_timestamp or datetime.now().isoformat()
+        problem_names = self._problem_names()
+
+        def compare_one(problem_name: str) -> PairwiseResult:
+            problem = Problem.load(self.problems_dir / problem_name)
+            problem_context = problem.get_context_for_agent()
+            print(
+                f"Running agents '{agent_a_name}' and '{agent_b_name}' "
+                f"on problem '{problem.name}'..."
+            )
+            solution_a = agent_a_function(problem_context)
+            solution_b = agent_b_function(problem_context)
+            return self.judge.evaluate_pairwise(
+                problem,
+                solution_a,
+                solution_b,
+                agent_a_name,
+                agent_b_name,
+                run_timestamp,
+            )
+
+        results = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(compare_one, name) for name in problem_names]
+            try:
+                for future in as_completed(futures):
+                    result = future.result()
+                    results.append(result)
+                    print(
+                        f"[{len(results)}/{len(problem_names)}] "
+                        f"{result.problem_name}: {result.winner or 'error'}"
+                    )
+            except FatalJudgeError as e:
+                pool.shutdown(wait=False, cancel_futures=True)
+                e.partial_results = sorted(results, key=lambda r: r.problem_name)
+                raise
+
+        results.sort(key=lambda r: r.problem_name)
         return results
 
+    def _result_cache_path(self, problem: Problem, agent_solution: str) -> Path:
+        """Result cache file for judging this solution with the current settings.
+
+        The key hashes the single-problem judge request (model, prompts,
+        rubric, expected and agent solutions, sampling parameters) plus the
+        list-wise batch size, so changing any of them is a miss and list-wise
+        scores are never reused by one-at-a-time runs or vice versa.
+        """
+        request = self.judge._build_request(problem, agent_solution)
+        if self.judge_batch_size > 1:
+            request["judge_batch_size"] = self.judge_batch_size
+        signature = self.judge._cache_key(request)[:16]
+        return self.results_cache_dir / problem.name / f"{signature}.json"
+
+    def _load_cached_result(
+        self,
+        problem: Problem,
+        agent_solution: str,
+        agent_name: str,
+        run_timestamp: Optional[str],
+    ) -> Optional[EvaluationResult]:
+        """Return a previously judged result for this exact solution, if any.
+
+        The result is restamped for the current run; token counts are zeroed
+        because no judge call is made.
+        """
+        if not self.judge.use_cache:
+            return None
+        cache_file = self._result_cache_path(problem, agent_solution)
+        if not cache_file.exists():
+            return None
+        try:
+            result = EvaluationResult(**json.loads(cache_file.read_text()))
+        except (TypeError, ValueError):
+            # Written by an older EvaluationResult layout; judge again
+            return None
+        return replace(
+            result,
+            agent_name=agent_name,
+            timestamp=run_timestamp or datetime.now().isoformat(),
+            prompt_tokens=0,
+            cached_tokens=0,
+        )
+
+    def _store_result(
+        self, problem: Problem, agent_solution: str, result: EvaluationResult
+    ):
+        """Cache a judged result; error results (no samples) are not cached."""
+        if not result.sample_scores:
+            return
+        _atomic_write_text(
+            self._result_cache_path(problem, agent_solution),
+            json.dumps(asdict(result)),
+        )
+
+    def _problem_names(self) -> List[str]:
+        """Names of all problem directories, sorted."""
+        return sorted(
+            problem_dir.name
+            for problem_dir in self.problems_dir.iterdir()
+            if problem_dir.is_dir() and (problem_dir / "problem.md").exists()
+        )
+
+    def _run_agent(
+        self,
+        problem_name: str,
+        agent_function: Callable[[str], str],
+        agent_name: str,
+    ) -> Tuple[Problem, str]:
+        """Load a problem and run the agent on it."""
+        problem = Problem.load(self.problems_dir / problem_name)
+        print(f"Running agent '{agent_name}' on problem '{problem.name}'...")
+        agent_solution = agent_function(problem.get_context_for_agent())
+        self._save_solutions(problem, agent_solution)
+        return problem, agent_solution
+
+    def _save_solutions(self, problem: Problem, agent_solution: str):
+        """Write the agent and expected solutions to the store unless present.
+
+        Results refer to them by ``_content_sha``, so each distinct solution
+        is kept once however many runs produce it.
+        """
+        for text in (agent_solution, problem.solution_md):
+            path = self.solutions_dir / f"{_content_sha(text)}.md"
+            if not path.exists():
+                _atomic_write_text(path, text)
+
+    def _judge_items(
+        self, items: List[Tuple[Problem, str, str]], run_timestamp: str
+    ) -> List[EvaluationResult]:
+        """Judge ``(problem, agent_solution, agent_name)`` items and cache results.
+
+        Several items are judged in one list-wise call, falling back to one
+        call per item if the batch response is unusable.
+        """
+        if len(items) == 1:
+            print(f"Evaluating solution with {self.judge.model} judge...")
+            judged = [self.judge.evaluate_solution(*items[0], timestamp=run_timestamp)]
+        else:
+            print(f"Evaluating {len(items)} solutions with {self.judge.model} judge...")
+            try:
+                judged = self.judge.evaluate_solutions_batch(items, run_timestamp)
+            except FatalJudgeError:
+                raise
+            except Exception as e:
+                print(
+                    f"Batch judging failed ({e}), falling back to one call per problem"
+                )
+                judged = [
+                    self.judge.evaluate_solution(*item, timestamp=run_timestamp)
+                    for item in items
+                ]
+
+        for (problem, agent_solution, _), result in zip(items, judged):
+            self._store_result(problem, agent_solution, result)
+        return judged
+
     def generate_report(self, results: List[EvaluationResult]):
         """Generate evaluation report."""
         self.reports_dir.mkdir(exist_ok=True)
+        # Results are normally stored as they complete; this covers callers
+        # that build result lists themselves. Re-adding is a no-op
+        self.results_store.add(results)
 
-        # Generate timestamp for report
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Name the report after the run it covers
+        run_time = (
+            datetime.fromisoformat(results[0].timestamp) if results else datetime.now()
+        )
+        timestamp = run_time.strftime("%Y%m%d_%H%M%S")
         agent_name = results[0].agent_name if results else "unknown"
 
         # Markdown report
@@ -334,31 +2011,47 @@ class CloudDebugEvaluator:
 
         agent_name = results[0].agent_name
         timestamp = results[0].timestamp
-        avg_score = sum(r.overall_score for r in results) / len(results)
+        problem_count, avg_score = self.results_store.average(results)
+        prompt_tokens = sum(r.prompt_tokens for r in results)
+        cached_tokens = sum(r.cached_tokens for r in results)
+        cache_hit_rate = (
+            f"{cached_tokens / prompt_tokens:.1%} ({cached_tokens}/{prompt_tokens} tokens)"
+            if prompt_tokens
+            else "n/a"
+        )
 
-        md = f"""# Cloud Debug Eval Report
+        parts = [
+            f"""# Cloud Debug Eval Report
 
 **Agent:** {agent_name}  
 **Timestamp:** {timestamp}  
-**Problems Evaluated:** {len(results)}  
-**Average Score:** {avg_score:.1f}/100
+**Problems Evaluated:** {problem_count}  
+**Average Score:** {avg_score:.1f}/100  
+**Prompt Cache Hit Rate:** {cache_hit_rate}
 
 ## Summary
 
 | Problem | Overall Score | Diagnosis | Solution | Investigation |
 |---------|---------------|-----------|----------|---------------|
 """
+        ]
 
-        for result in results:
-            md += f"| {result.problem_name} | {result.overall_score}/100 | {result.diagnosis_accuracy}/100 | {result.solution_correctness}/100 | {result.investigation_quality}/100 |\n"
+        parts.extend(
+            f"| {problem} | {overall:.0f}/100 | {diagnosis:.0f}/100 | {solution:.0f}/100 | {investigation:.0f}/100 |\n"
+            for problem, overall, diagnosis, solution, investigation in (
+                self.results_store.summary(results)
+            )
+        )
 
-        md += "\n## Detailed Results\n\n"
+        parts.append("\n## Detailed Results\n\n")
 
         # Detailed results
         for result in results:
-            md += f"""### {result.problem_name}
+            parts.append(f"""### {result.problem_name}
 
 **Overall Score:** {result.overall_score}/100
+{self._format_judge_agreement(result)}
+**Solutions:** [agent](solutions/{result.agent_solution_sha}.md) · [expected](solutions/{result.expected_solution_sha}.md)
 
 **Scores:**
 - Diagnosis Accuracy: {result.diagnosis_accuracy}/100
@@ -372,15 +2065,138 @@ class CloudDebugEvaluator:
 {result.judge_reasoning}
 ---
 
+""")
+
+        return "".join(parts)
+
+    def generate_comparison_report(self, results: List[PairwiseResult]):
+        """Generate a pairwise comparison report."""
+        self.reports_dir.mkdir(exist_ok=True)
+
+        run_time = (
+            datetime.fromisoformat(results[0].timestamp) if results else datetime.now()
+        )
+        timestamp = run_time.strftime("%Y%m%d_%H%M%S")
+        agent_a = results[0].agent_a if results else "a"
+        agent_b = results[0].agent_b if results else "b"
+
+        md_path = (
+            self.reports_dir / f"compare_report_{agent_a}_vs_{agent_b}_{timestamp}.md"
+        )
+        with open(md_path, "w") as f:
+            f.write(self._generate_comparison_md_report(results))
+        return md_path
+
+    def _generate_comparison_md_report(self, results: List[PairwiseResult]) -> str:
+        """Generate Markdown pairwise comparison report."""
+        if not results:
+            return "# No results to report"
+
+        agent_a = results[0].agent_a
+        agent_b = results[0].agent_b
+        wins_a, wins_b, ties = _count_outcomes(results)
+
+        parts = [
+            f"""# Cloud Debug Eval Comparison Report
+
+**Agent A:** {agent_a}  
+**Agent B:** {agent_b}  
+**Timestamp:** {results[0].timestamp}  
+**Problems Compared:** {len(results)}  
+**Wins / Losses / Ties:** {wins_a} / {wins_b} / {ties}  
+**Win Rate ({agent_a} over {agent_b}):** {_format_win_rate(results)}
+
+## Summary
+
+| Problem | Winner | Judge Samples |
+|---------|--------|---------------|
 """
+        ]
+
+        names = {"a": agent_a, "b": agent_b, "tie": "tie", None: "error"}
+        parts.extend(
+            f"| {result.problem_name} | {names[result.winner]} | {', '.join(result.sample_winners)} |\n"
+            for result in results
+        )
+
+        parts.append("\n## Detailed Results\n\n")
+
+        for result in results:
+            parts.append(f"""### {result.problem_name}
 
-        return md
+**Winner:** {names[result.winner]}
 
+**Judge Reasoning:**
+{result.judge_reasoning}
+---
 
-def evaluate(agent_function: Callable[[str], str], agent_name: str = "unknown"):
+""")
+
+        return "".join(parts)
+
+    def _format_judge_agreement(self, result: EvaluationResult) -> str:
+        """Report line describing judge sample spread; empty for single samples."""
+        if len(result.sample_scores) < 2:
+            return ""
+        samples = ", ".join(str(score) for score in result.sample_scores)
+        flag = (
+            " (high disagreement)"
+            if result.score_stddev > DISAGREEMENT_STDDEV
+            else ""
+        )
+        return (
+            f"\n**Judge Samples:** {samples} "
+            f"(std-dev {result.score_stddev:.1f}){flag}\n"
+        )
+
+
+def evaluate(
+    agent_function: Callable[[str], str],
+    agent_name: str = "unknown",
+    use_cache: bool = True,
+    judge_batch_size: int = 1,
+    use_batch_api: bool = False,
+    use_async: bool = False,
+    judge_model: str = "gpt-4o",
+    judge_samples: int = 3,
+):
     """Evaluate all problems and generate report."""
-    evaluator = CloudDebugEvaluator()
-    results = evaluator.evaluate_all_problems(agent_function, agent_name)
+    if use_batch_api and use_async:
+        raise ValueError("use_batch_api and use_async are mutually exclusive")
+    if judge_batch_size > 1 and (use_batch_api or use_async):
+        raise ValueError(
+            "judge_batch_size only applies to the thread-pool evaluation, "
+            "not to use_batch_api or use_async"
+        )
+    # One timestamp per run keeps results reproducible and comparable
+    run_timestamp = datetime.now().isoformat()
+    evaluator = CloudDebugEvaluator(
+        judge_model=judge_model,
+        use_cache=use_cache,
+        judge_batch_size=judge_batch_size,
+        judge_samples=judge_samples,
+    )
+    try:
+        if use_batch_api:
+            results = evaluator.evaluate_all_problems_batch(
+                agent_function, agent_name, run_timestamp
+            )
+        elif use_async:
+            results = asyncio.run(
+                evaluator.evaluate_all_problems_async(
+                    agent_function, agent_name, run_timestamp
+                )
+            )
+        else:
+            results = evaluator.evaluate_all_problems(
+                agent_function, agent_name, run_timestamp
+            )
+    except FatalJudgeError as e:
+        # Report what finished, without zero scores for the aborted problems
+        if e.partial_results:
+            md_path = evaluator.generate_report(e.partial_results)
+            print(f"Partial report for {len(e.partial_results)} problems: {md_path}")
+        raise
     evaluator.generate_report(results)
 
     print(f"\n=== Summary for {len(results)} problems ===")
@@ -389,3 +2205,56 @@ def evaluate(agent_function: Callable[[str], str], agent_name: str = "unknown"):
 
     for result in results:
         print(f"{result.problem_name}: {result.overall_score}/100")
+
+
+def compare(
+    agent_a_function: Callable[[str], str],
+    agent_b_function: Callable[[str], str],
+    agent_a_name: str = "a",
+    agent_b_name: str = "b",
+    use_cache: bool = True,
+    judge_model: str = "gpt-4o",
+    judge_samples: int = 3,
+):
+    """Compare two agents on all problems and generate a comparison report."""
+    run_timestamp = datetime.now().isoformat()
+    evaluator = CloudDebugEvaluator(
+        judge_model=judge_model, use_cache=use_cache, judge_samples=judge_samples
+    )
+    try:
+        results = evaluator.compare_agents(
+            agent_a_function,
+            agent_b_function,
+            agent_a_name,
+            agent_b_name,
+            run_timestamp,
+        )
+    except FatalJudgeError as e:
+        if e.partial_results:
+            md_path = evaluator.generate_comparison_report(e.partial_results)
+            print(f"Partial report for {len(e.partial_results)} problems: {md_path}")
+        raise
+    evaluator.generate_comparison_report(results)
+
+    print(f"\n=== {agent_a_name} vs {agent_b_name} on {len(results)} problems ===")
+    print(f"Win rate: {_format_win_rate(results)}")
+
+
+def compare_runs(
+    agent_a: str, agent_b: str, db_path: Path = Path("reports/results.db")
+):
+    """Print per-problem score differences between two agents' latest runs."""
+    store = ResultsStore(db_path)
+    try:
+        rows = store.compare_latest(agent_a, agent_b)
+    finally:
+        store.close()
+    if not rows:
+        print(f"No problems scored for both '{agent_a}' and '{agent_b}'")
+        return
+
+    print(f"=== {agent_a} vs {agent_b} on {len(rows)} problems ===")
+    for problem, overall_a, overall_b in rows:
+        print(f"{problem}: {overall_a} vs {overall_b} ({overall_a - overall_b:+d})")
+    wins = sum(1.0 if a > b else 0.5 if a == b else 0.0 for _, a, b in rows)
+    print(f"Win rate ({agent_a} over {agent_b}): {wins / len(rows):.1%}")
@@ -0,0 +1,391 @@
+import json
+import os
+import re
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from src.evaluator import (
+    MMAP_THRESHOLD,
+    CloudDebugEvaluator,
+    FatalJudgeError,
+    JudgeBackend,
+    OpenAIJudge,
+    Problem,
+)
+
+
+class FakeJudge(JudgeBackend):
+    """Judge that scores every solution without calling a model.
+
+    With ``bad_indices`` set, list-wise replies number every problem 1.
+    """
+
+    def __init__(self, cache_dir: Path, bad_indices: bool = False):
+        super().__init__("fake-judge", cache_dir=cache_dir, samples=1)
+        self.bad_indices = bad_indices
+        self.judged = []
+
+    def _complete(self, request, user, prompt_cache_key):
+        judgment = {
+            "diagnosis_accuracy": 80,
+            "solution_correctness": 70,
+            "investigation_quality": 60,
+            "reasoning": "ok",
+            "feedback": "ok",
+        }
+        if request["response_format"]["json_schema"]["name"] == "batch_judgment":
+            prompt = request["messages"][-1]["content"]
+            count = len(re.findall(r"^### Problem \d+$", prompt, re.MULTILINE))
+            self.judged.append(count)
+            response = {
+                "evaluations": [
+                    dict(judgment, problem_index=1 if self.bad_indices else i + 1)
+                    for i in range(count)
+                ]
+            }
+        else:
+            self.judged.append(1)
+            response = judgment
+        return [json.dumps(response)], 0, 0
+
+
+class ScriptedJudge(JudgeBackend):
+    """Judge that answers every request with the same sampled judgments."""
+
+    def __init__(self, cache_dir: Path, judgments):
+        super().__init__(
+            "scripted-judge", cache_dir=cache_dir, samples=len(judgments)
+        )
+        self.responses = [json.dumps(judgment) for judgment in judgments]
+
+    def _complete(self, request, user, prompt_cache_key):
+        return list(self.responses), 0, 0
+
+
+class StubBatchClient:
+    """OpenAI client stand-in whose batches finish as soon as they are created.
+
+    ``answer`` maps each input line to an output file entry, an error file
+    entry (``(entry, True)``) or None for requests the batch never reached.
+    """
+
+    def __init__(self, answer, status="completed", errors=None):
+        self.answer = answer
+        self.status = status
+        self.errors = errors
+        self.contents = {}
+        self.files = SimpleNamespace(create=self._create_file, content=self._content)
+        self.batches = SimpleNamespace(create=self._create_batch)
+
+    def _create_file(self, file, purpose):
+        file_id = f"file-{len(self.contents)}"
+        self.contents[file_id] = file.read().decode()
+        return SimpleNamespace(id=file_id)
+
+    def _content(self, file_id):
+        return SimpleNamespace(text=self.contents[file_id])
+
+    def _create_batch(self, input_file_id, endpoint, completion_window):
+        outputs, errors = [], []
+        for line in self.contents[input_file_id].splitlines():
+            answered = self.answer(json.loads(line))
+            if answered is None:
+                continue
+            entry, failed = answered
+            (errors if failed else outputs).append(json.dumps(entry))
+        output_file_id = f"file-{len(self.contents)}"
+        self.contents[output_file_id] = "\n".join(outputs)
+        error_file_id = f"file-{len(self.contents)}"
+        self.contents[error_file_id] = "\n".join(errors)
+        return SimpleNamespace(
+            id="batch-1",
+            status=self.status,
+            errors=self.errors,
+            output_file_id=output_file_id,
+            error_file_id=error_file_id,
+        )
+
+
+JUDGMENT = {
+    "diagnosis_accuracy": 80,
+    "solution_correctness": 70,
+    "investigation_quality": 60,
+    "reasoning": "ok",
+    "feedback": "ok",
+}
+
+
+def make_problem(name: str) -> Problem:
+    return Problem(
+        name=name,
+        path=Path(name),
+        problem_md=f"Problem {name}",
+        solution_md=f"Solution {name}",
+        logs={},
+        configs={},
+    )
+
+
+def slow_agent(problem_context: str) -> str:
+    # Keeps agents finishing one at a time so the last one completes alone
+    time.sleep(0.05)
+    return "solution"
+
+
+class EvaluateAllProblemsTest(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+        for name in ["p1", "p2", "p3", "p4", "p5"]:
+            problem_dir = Path("problems") / name
+            problem_dir.mkdir(parents=True)
+            (problem_dir / "problem.md").write_text(f"Problem {name}")
+            (problem_dir / "solution.md").write_text(f"Solution {name}")
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def make_evaluator(self, **kwargs) -> CloudDebugEvaluator:
+        judge = FakeJudge(Path(".judge_cache"))
+        with mock.patch("src.evaluator.create_judge", return_value=judge):
+            return CloudDebugEvaluator(max_workers=1, agent_workers=1, **kwargs)
+
+    def test_partial_chunk_judged_when_last_agent_hits_result_cache(self):
+        # Cache p5's result so the last agent to finish is a cache hit while
+        # p4 is still waiting for its chunk to fill
+        self.make_evaluator(judge_batch_size=3).evaluate_with_agent(
+            "p5", slow_agent, "agent"
+        )
+
+        evaluator = self.make_evaluator(judge_batch_size=3)
+        results = evaluator.evaluate_all_problems(slow_agent, "agent")
+
+        self.assertEqual(
+            [r.problem_name for r in results], ["p1", "p2", "p3", "p4", "p5"]
+        )
+        self.assertEqual(evaluator.judge.judged, [3, 1])
+
+    def test_unusable_list_wise_reply_falls_back_to_one_call_per_problem(self):
+        evaluator = self.make_evaluator(judge_batch_size=3)
+        evaluator.judge.bad_indices = True
+        items = [
+            (Problem.load(Path("problems") / name), "solution", "agent")
+            for name in ["p1", "p2", "p3"]
+        ]
+
+        results = evaluator._judge_items(items, "2024-01-01T00:00:00")
+
+        self.assertEqual(evaluator.judge.judged, [3, 1, 1, 1])
+        self.assertEqual([r.overall_score for r in results], [72, 72, 72])
+
+
+class JudgeBackendTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self._tmp.name) / ".judge_cache"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_scores_are_sample_medians_with_closest_sample_as_feedback(self):
+        judge = ScriptedJudge(
+            self.cache_dir,
+            [
+                dict(
+                    JUDGMENT,
+                    diagnosis_accuracy=90,
+                    solution_correctness=60,
+                    investigation_quality=10,
+                    feedback="first",
+                ),
+                dict(
+                    JUDGMENT,
+                    diagnosis_accuracy=50,
+                    solution_correctness=80,
+                    investigation_quality=30,
+                    feedback="second",
+                ),
+                dict(
+                    JUDGMENT,
+                    diagnosis_accuracy=70,
+                    solution_correctness=40,
+                    investigation_quality=20,
+                    feedback="third",
+                ),
+            ],
+        )
+
+        result = judge.evaluate_solution(make_problem("p1"), "solution", "agent")
+
+        self.assertEqual(
+            (
+                result.diagnosis_accuracy,
+                result.solution_correctness,
+                result.investigation_quality,
+                result.overall_score,
+            ),
+            (70, 60, 20, 56),
+        )
+        self.assertEqual(result.sample_scores, [62, 58, 48])
+        # 58 is the sample score closest to the aggregate of 56
+        self.assertEqual(result.judge_feedback, "second")
+
+    def test_pairwise_winner_is_majority_vote(self):
+        judge = ScriptedJudge(
+            self.cache_dir,
+            [
+                {"winner": "b", "reasoning": "b first"},
+                {"winner": "a", "reasoning": "a"},
+                {"winner": "b", "reasoning": "b second"},
+            ],
+        )
+
+        result = judge.evaluate_pairwise(make_problem("p1"), "one", "two")
+
+        self.assertEqual(result.winner, "b")
+        self.assertEqual(result.sample_winners, ["b", "a", "b"])
+        self.assertEqual(result.judge_reasoning, "b first")
+
+    def test_pairwise_split_vote_is_tie(self):
+        judge = ScriptedJudge(
+            self.cache_dir,
+            [
+                {"winner": "a", "reasoning": "a"},
+                {"winner": "b", "reasoning": "b"},
+            ],
+        )
+
+        result = judge.evaluate_pairwise(make_problem("p1"), "one", "two")
+
+        self.assertEqual(result.winner, "tie")
+        # No sample voted tie, so the first one explains the verdict
+        self.assertEqual(result.judge_reasoning, "a")
+
+    def test_list_wise_reply_with_wrong_indices_raises_and_is_not_cached(self):
+        judge = FakeJudge(self.cache_dir, bad_indices=True)
+        items = [(make_problem(name), "solution", "agent") for name in ["p1", "p2"]]
+
+        with self.assertRaisesRegex(ValueError, r"indices \[1, 1\] for 2"):
+            judge.evaluate_solutions_batch(items)
+        self.assertFalse(self.cache_dir.exists() and any(self.cache_dir.iterdir()))
+
+
+class BatchApiTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.work_dir = Path(self._tmp.name)
+        with mock.patch("openai.OpenAI"):
+            self.judge = OpenAIJudge(
+                api_key="test", cache_dir=self.work_dir / ".judge_cache", samples=1
+            )
+        self.items = [
+            (make_problem(name), "solution", "agent") for name in ["p1", "p2", "p3"]
+        ]
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    @staticmethod
+    def output(line):
+        body = {
+            "choices": [
+                {"message": {"content": json.dumps(JUDGMENT)}, "finish_reason": "stop"}
+            ],
+            "usage": {"prompt_tokens": 100, "prompt_tokens_details": None},
+        }
+        return {
+            "custom_id": line["custom_id"],
+            "response": {"status_code": 200, "body": body},
+            "error": None,
+        }, False
+
+    @staticmethod
+    def failure(line):
+        return {
+            "custom_id": line["custom_id"],
+            "response": {"status_code": 500, "body": {"error": "boom"}},
+            "error": None,
+        }, True
+
+    def test_reads_output_and_error_files(self):
+        self.judge.client = StubBatchClient(
+            lambda line: self.failure(line)
+            if line["custom_id"] == "item-1"
+            else self.output(line)
+        )
+
+        results = self.judge.evaluate_solutions_offline(self.items, self.work_dir)
+
+        self.assertEqual([r.overall_score for r in results], [72, 0, 72])
+        self.assertIn("boom", results[1].judge_feedback)
+        self.assertEqual([r.prompt_tokens for r in results], [100, 0, 100])
+        # Only successful judgments are cached
+        self.assertEqual(len(list((self.work_dir / ".judge_cache").iterdir())), 2)
+
+    def test_expired_batch_raises_with_finished_items(self):
+        errors = SimpleNamespace(
+            data=[
+                SimpleNamespace(
+                    code="batch_expired", message="not finished in 24h", line=None
+                )
+            ]
+        )
+
+        def answer(line):
+            # The batch expired before reaching the last request
+            if line["custom_id"] == "item-2":
+                return None
+            if line["custom_id"] == "item-1":
+                return self.failure(line)
+            return self.output(line)
+
+        self.judge.client = StubBatchClient(answer, status="expired", errors=errors)
+
+        with self.assertRaisesRegex(FatalJudgeError, "expired: batch_expired") as ctx:
+            self.judge.evaluate_solutions_offline(self.items, self.work_dir)
+        partial = ctx.exception.partial_results
+        self.assertEqual([r.problem_name for r in partial], ["p1", "p2"])
+        self.assertEqual([r.overall_score for r in partial], [72, 0])
+
+
+class ProblemLoadTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.problem_dir = Path(self._tmp.name) / "p1"
+        (self.problem_dir / "logs").mkdir(parents=True)
+        (self.problem_dir / "problem.md").write_text("Problem")
+        (self.problem_dir / "solution.md").write_text("Solution")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_reloads_after_files_change(self):
+        self.assertEqual(Problem.load(self.problem_dir).problem_md, "Problem")
+
+        (self.problem_dir / "problem.md").write_text("Problem, revised")
+        (self.problem_dir / "logs" / "app.log").write_text("error")
+        problem = Problem.load(self.problem_dir)
+
+        self.assertEqual(problem.problem_md, "Problem, revised")
+        self.assertEqual(problem.logs, {"app.log": "error"})
+
+    def test_memory_mapped_files_get_universal_newlines(self):
+        line = "x" * 99 + "\r\n"
+        path = self.problem_dir / "logs" / "big.log"
+        path.write_bytes(line.encode() * (MMAP_THRESHOLD // len(line) + 1))
+        self.assertGreaterEqual(path.stat().st_size, MMAP_THRESHOLD)
+
+        log = Problem.load(self.problem_dir).logs["big.log"]
+
+        self.assertNotIn("\r", log)
+        self.assertEqual(log, path.read_text())
+
+
+if __name__ == "__main__":
+    unittest.main()